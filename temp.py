@@ -1,23 +1,92 @@
+import asyncio
+import atexit
+import hashlib
+import heapq
+import html
+import json
+import logging
 import os
+import random
 import re
+import sqlite3
 import tempfile
+import threading
+import time
 import webbrowser
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
 
-from groq import Groq
+import httpx
+from groq import APIConnectionError, AsyncGroq, InternalServerError, RateLimitError
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+try:
+    import orjson
+
+    def _dumps_json(obj):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+
+    _loads_json = orjson.loads
+except ImportError:
+    # Same compact, sorted, UTF-8 output as orjson so cache keys match either way
+    def _dumps_json(obj):
+        return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+    _loads_json = json.loads
+
+try:
+    # C-accelerated escaping when markupsafe is installed
+    from markupsafe import escape as _markupsafe_escape
+
+    def escape_html(text):
+        return str(_markupsafe_escape(text))
+except ImportError:
+    def escape_html(text):
+        return html.escape(text)
+
+# Newlines become <br> and carriage returns are dropped, in one pass
+_NEWLINE_TO_BR = str.maketrans({"\n": "<br>", "\r": ""})
+
+def _escape_multiline(text):
+    """HTML-escape text and convert its line breaks to <br>."""
+    return escape_html(text).translate(_NEWLINE_TO_BR)
+
+logger = logging.getLogger(__name__)
+
+_SCORE_RE = re.compile(r"\b(\d{1,3})\b")
 
 # Load environment variables from .env file if it exists
 def load_env():
-    """Load environment variables from .env file"""
+    """Load environment variables from .env file, unless the API key is already set"""
+    if os.getenv("GROQ_API_KEY"):
+        return
     try:
-        with open('.env', 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith('#'):
-                    key, value = line.strip().split('=', 1)
-                    os.environ[key] = value
+        lines = Path('.env').read_text().splitlines()
     except FileNotFoundError:
-        pass
+        return
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            key, sep, value = line.partition('=')
+            if sep:
+                os.environ[key] = value
 
 # Load .env file
 load_env()
@@ -47,23 +116,453 @@ def get_groq_api_key():
         "3. Add GROQ_API_KEY=your_key_here to .env file"
     )
 
-try:
-    groq_api_key = get_groq_api_key()
-    print(f"✅ API Key loaded successfully (ends with: ...{groq_api_key[-8:]})")
-except Exception as e:
-    print(f"❌ Error loading API key: {e}")
-    exit(1)
+async def _log_http_version(response):
+    """Debug hook confirming whether requests are multiplexed over HTTP/2."""
+    logger.debug("%s %s -> %s", response.request.method, response.url, response.http_version)
+
+# Every pooled connection is kept alive, so HTTP/1.1 fallback never re-handshakes
+HTTP_MAX_CONNECTIONS = 64
+
+_client = None
+_client_loop = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide AsyncGroq client, creating it on first use.
+
+    The API key is only resolved here, so importing this module does no file
+    I/O for it. All generation and scoring calls share this client and its HTTP connection
+    pool; with HTTP/2 the concurrent calls multiplex over one connection.
+    Pooled connections belong to the event loop that opened them, so a call
+    from a different loop (e.g. a second asyncio.run) gets a fresh client.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        with _client_lock:
+            if _client is None or _client_loop is not loop:
+                http_client = httpx.AsyncClient(
+                    http2=HTTP2_AVAILABLE,
+                    limits=httpx.Limits(
+                        max_connections=HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                    ),
+                    timeout=httpx.Timeout(60.0, connect=5.0),
+                    event_hooks={"response": [_log_http_version]},
+                )
+                # Retries are handled by _create_completion, not the SDK
+                _client = AsyncGroq(
+                    api_key=get_groq_api_key(), http_client=http_client, max_retries=0
+                )
+                _client_loop = loop
+    return _client
+
+async def close_client():
+    """Close the shared Groq client and its underlying HTTP connection pool."""
+    global _client, _client_loop
+    with _client_lock:
+        client, _client, _client_loop = _client, None, None
+    if client is not None:
+        await client.close()
+
+def _close_client_at_exit():
+    """Release the connection pool if the caller never closed the client."""
+    if _client is not None and not _client.is_closed():
+        try:
+            asyncio.run(close_client())
+        except RuntimeError:
+            pass
+
+atexit.register(_close_client_at_exit)
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("AUTOTEMP_MAX_INFLIGHT", "50"))
+
+# Transient failures worth retrying with exponential backoff + jitter
+_RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+RETRY_ATTEMPTS = 4
+RETRY_INITIAL_WAIT = 1.0
+RETRY_MAX_WAIT = 8.0
+
+class RateLimiter:
+    """Token bucket allowing at most `rate` requests per `period` seconds."""
+
+    def __init__(self, rate, period=60.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent, then consume one token."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.rate, self._tokens + (now - self._updated) * self.rate / self.period
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+
+# Errors that mean the provider is overloaded and we should send less at once
+_OVERLOAD_ERRORS = (RateLimitError, InternalServerError)
+# Minimum seconds between two cuts, so one burst of 429s only halves the cap once
+CONCURRENCY_DECREASE_COOLDOWN = 1.0
+
+class AdaptiveConcurrency:
+    """Cap on in-flight requests that adapts AIMD-style to provider overload.
+
+    The cap halves (down to 1) when a request fails with a rate-limit or 5xx
+    error, and grows by one after each run of `limit` consecutive successes,
+    never exceeding `max_limit`.
+    """
+
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self._active = 0
+        self._streak = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self._active -= 1
+            if exc is None:
+                self._streak += 1
+                if self._streak >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._streak = 0
+            elif isinstance(exc, _OVERLOAD_ERRORS):
+                self._streak = 0
+                now = time.monotonic()
+                if self.limit > 1 and now - self._last_decrease >= CONCURRENCY_DECREASE_COOLDOWN:
+                    self.limit = max(1, self.limit // 2)
+                    self._last_decrease = now
+                    print(f"🐢 Provider overloaded, lowering concurrency to {self.limit}")
+            self._cond.notify_all()
+        return False
+
+_request_slots = AdaptiveConcurrency(DEFAULT_MAX_CONCURRENCY)
+_rate_limiter = None
+
+def configure_limits(max_concurrency=DEFAULT_MAX_CONCURRENCY, rpm=None):
+    """Set the in-flight request cap and optional requests-per-minute limit."""
+    global _request_slots, _rate_limiter
+    _request_slots = AdaptiveConcurrency(max_concurrency)
+    _rate_limiter = RateLimiter(rpm) if rpm else None
+
+def _retry_after(error):
+    """Seconds the server asked us to wait via Retry-After, or 0 if it didn't say."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return 0.0
+    try:
+        return max(0.0, float(response.headers.get("retry-after", 0)))
+    except ValueError:
+        return 0.0
+
+async def _create_completion(**kwargs):
+    """Send a chat completion once a concurrency slot and rate-limit token are free.
+
+    The number of slots shrinks while the provider is overloaded (see
+    AdaptiveConcurrency). Rate limits, connection errors and 5xx responses
+    are retried with exponential backoff and jitter, waiting at least as long
+    as any Retry-After header asks; the last error is raised once
+    RETRY_ATTEMPTS is exhausted.
+    """
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            async with _request_slots:
+                if _rate_limiter is not None:
+                    await _rate_limiter.acquire()
+                return await get_client().chat.completions.create(**kwargs)
+        except _RETRYABLE_ERRORS as e:
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+            delay = min(RETRY_MAX_WAIT, RETRY_INITIAL_WAIT * 2**attempt) + random.random()
+            delay = max(delay, _retry_after(e))
+            print(f"⏳ {type(e).__name__}, retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+CACHE_DIR = os.getenv("AUTOTEMP_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "autotemp"
+)
+CACHE_PATH = os.path.join(CACHE_DIR, "cache.sqlite3")
+
+class DiskCache:
+    """Small SQLite-backed key/value store with optional per-entry expiry."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._unavailable = False
+
+    def _connect(self):
+        """Open the database on first use; None if it cannot be opened."""
+        if self._conn is None and not self._unavailable:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                conn = sqlite3.connect(self.path, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache"
+                    " (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+                )
+            except (OSError, sqlite3.Error) as e:
+                # e.g. a read-only home directory: run without the cache
+                print(f"⚠️  Disk cache unavailable ({e}); continuing without it.")
+                self._unavailable = True
+                return None
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing, expired or unavailable."""
+        conn = self._connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error reading cache: {e}")
+            return None
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return _loads_json(row[0])
+
+    def set(self, key, value, expire=None):
+        """Store value under key, optionally expiring after `expire` seconds."""
+        conn = self._connect()
+        if conn is None:
+            return
+        expires_at = time.time() + expire if expire is not None else None
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, _dumps_json(value), expires_at),
+            )
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error writing cache: {e}")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+disk_cache = DiskCache(CACHE_PATH)
+
+class SemanticCache:
+    """Reuse ranked responses for near-duplicate prompts.
+
+    Prompts are embedded with a small local sentence-transformers model and
+    looked up in a persistent FAISS inner-product index; a hit above
+    `threshold` cosine similarity for the same Groq model, covering every
+    requested temperature, returns the stored responses. Requires the
+    optional faiss and sentence-transformers packages.
+    """
+
+    def __init__(
+        self,
+        directory,
+        threshold=0.95,
+        max_best_temperature=0.5,
+        embedding_model="sentence-transformers/all-MiniLM-L6-v2",
+    ):
+        self.index_path = os.path.join(directory, "semantic.faiss")
+        self.entries_path = os.path.join(directory, "semantic.json")
+        self.threshold = threshold
+        self.max_best_temperature = max_best_temperature
+        self.embedding_model = embedding_model
+        self._encoder = None
+        self._index = None
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._encoder is None:
+            self._encoder = SentenceTransformer(self.embedding_model)
+            dim = self._encoder.get_sentence_embedding_dimension()
+            try:
+                self._index = faiss.read_index(self.index_path)
+                with open(self.entries_path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (RuntimeError, OSError, json.JSONDecodeError):
+                self._index = faiss.IndexFlatIP(dim)
+                self._entries = []
+
+    def _embed(self, prompt):
+        return np.asarray(
+            self._encoder.encode([prompt], normalize_embeddings=True), dtype="float32"
+        )
+
+    def lookup(self, prompt, model, temperatures):
+        """Return cached responses for a similar prompt, or None.
+
+        Only entries that cover every requested temperature count as a hit;
+        their responses are narrowed to those temperatures, in temperature
+        order, and need ranking again.
+        """
+        wanted = set(temperatures)
+        with self._lock:
+            self._load()
+            if not self._entries:
+                return None
+            similarities, ids = self._index.search(
+                self._embed(prompt), min(5, len(self._entries))
+            )
+            for similarity, idx in zip(similarities[0], ids[0]):
+                if similarity < self.threshold:
+                    break
+                entry = self._entries[idx]
+                if entry["model"] != model or not wanted <= set(entry.get("temperatures", ())):
+                    continue
+                return sorted(
+                    (dict(r) for r in entry["responses"] if r["temperature"] in wanted),
+                    key=lambda r: r["temperature"],
+                )
+        return None
+
+    def add(self, prompt, model, ranked_responses):
+        """Remember ranked responses, unless the best one came from a creative temperature."""
+        if not ranked_responses or ranked_responses[0]["status"] != "success":
+            return
+        if ranked_responses[0]["temperature"] > self.max_best_temperature:
+            return
+        with self._lock:
+            self._load()
+            self._index.add(self._embed(prompt))
+            self._entries.append(
+                {
+                    "prompt": prompt,
+                    "model": model,
+                    "temperatures": sorted({r["temperature"] for r in ranked_responses}),
+                    "responses": ranked_responses,
+                }
+            )
+            self._dirty = True
+
+    def save(self):
+        """Persist the index and its entries if anything was added."""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            faiss.write_index(self._index, self.index_path)
+            with open(self.entries_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            self._dirty = False
+
+semantic_cache = SemanticCache(CACHE_DIR) if SEMANTIC_CACHE_AVAILABLE else None
+
+CHECKPOINT_PATH = "autotemp.jsonl"
+
+def _ends_with_newline(path):
+    """True if the non-empty file at path ends with a newline."""
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
 
-client = Groq(api_key=groq_api_key)
+class Checkpoint:
+    """Append-only JSONL log of scored responses, so an interrupted run can resume.
 
-def generate_response(prompt, temperature, model="llama3-70b-8192"):
-    """Generate a single response at a given temperature."""
+    Each line records one successful (prompt, temperature, model) result;
+    failed responses are not logged and are retried on the next run.
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = path
+        self._done = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = _loads_json(line)
+                    except ValueError:
+                        continue  # torn last line from an interrupted write
+                    self._done[(row["prompt_hash"], row["temperature"], row["model"])] = row
+        except FileNotFoundError:
+            pass
+        self._file = open(path, "a", buffering=1, encoding="utf-8")
+        if self._file.tell() and not _ends_with_newline(path):
+            # Terminate a torn last line so the next row starts on its own line
+            self._file.write("\n")
+
+    @staticmethod
+    def _prompt_hash(prompt):
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    def restore(self, prompt, temperatures, model):
+        """Return fresh response dicts for the temperatures already completed."""
+        prompt_hash = self._prompt_hash(prompt)
+        restored = []
+        for temperature in temperatures:
+            row = self._done.get((prompt_hash, temperature, model))
+            if row is not None:
+                restored.append(
+                    {
+                        "temperature": temperature,
+                        "response": row["response"],
+                        "status": "success",
+                        "score": row["score"],
+                    }
+                )
+        return restored
+
+    def record(self, prompt, model, responses):
+        """Append every successful response to the log."""
+        prompt_hash = self._prompt_hash(prompt)
+        for response in responses:
+            if response["status"] != "success":
+                continue
+            row = {
+                "prompt_hash": prompt_hash,
+                "temperature": response["temperature"],
+                "model": model,
+                "response": response["response"],
+                "score": response["score"],
+            }
+            self._done[(prompt_hash, response["temperature"], model)] = row
+            self._file.write(_dumps_json(row) + "\n")
+
+    def close(self):
+        self._file.close()
+
+def _cache_key(kind, **fields):
+    """SHA-256 of the request fields, namespaced by the kind of call."""
+    payload = _dumps_json(fields)
+    return f"{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+GENERATION_MAX_TOKENS = 512
+# Generations are only persisted when sampling is near-deterministic, unless
+# the caller opts in; cached generations expire after a day.
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.1
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+
+RESPONSE_CACHE_SIZE = 1024
+# (model, prompt, temperature) -> successful response, least recently used first
+_response_cache = OrderedDict()
+_inflight_responses = {}
+
+async def _generate_response(prompt, temperature, model):
+    """Call Groq for a single response at a given temperature."""
     try:
-        completion = client.chat.completions.create(
+        completion = await _create_completion(
             model=model,
             messages=[{"role": "user", "content": prompt}],
             temperature=temperature,
-            max_tokens=512,
+            max_tokens=GENERATION_MAX_TOKENS,
             top_p=1,
             stream=False,
         )
@@ -79,45 +578,142 @@ def generate_response(prompt, temperature, model="llama3-70b-8192"):
             "status": "error",
         }
 
-def generate_responses_parallel(prompt, temperatures, model="llama3-70b-8192"):
-    """Generate responses in parallel for faster execution."""
-    responses = []
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        future_to_temp = {
-            executor.submit(generate_response, prompt, temp, model): temp
+def _generation_disk_key(prompt, temperature, model, cache_responses):
+    """On-disk cache key for a generation, or None if it should not be persisted."""
+    if not (cache_responses or temperature <= RESPONSE_CACHE_MAX_TEMPERATURE):
+        return None
+    return _cache_key(
+        "generation",
+        model=model,
+        prompt=prompt,
+        temperature=temperature,
+        max_tokens=GENERATION_MAX_TOKENS,
+    )
+
+def _cached_response(key, disk_key):
+    """Return a copy of a cached response from memory or disk, or None."""
+    if key in _response_cache:
+        _response_cache.move_to_end(key)
+        return dict(_response_cache[key])
+    if disk_key is not None:
+        cached = disk_cache.get(disk_key)
+        if cached is not None:
+            _remember_response(key, cached)
+            return dict(cached)
+    return None
+
+def _store_response(key, disk_key, result):
+    """Cache a successful response in memory and, if it has a disk key, on disk."""
+    if key not in _response_cache and disk_key is not None:
+        disk_cache.set(disk_key, result, expire=RESPONSE_CACHE_TTL)
+    _remember_response(key, result)
+
+def _remember_response(key, result):
+    """Insert a response into the in-memory LRU, evicting the oldest beyond its size."""
+    _response_cache[key] = result
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+async def generate_response(
+    prompt, temperature, model="llama3-70b-8192", cache_responses=False
+):
+    """Generate a single response at a given temperature.
+
+    Identical (model, prompt, temperature) calls share one in-flight request,
+    and successful responses are kept in an in-memory LRU cache. Responses at
+    temperatures up to RESPONSE_CACHE_MAX_TEMPERATURE, or any temperature with
+    cache_responses, are also persisted in the on-disk cache.
+    """
+    key = (model, prompt, temperature)
+    disk_key = _generation_disk_key(prompt, temperature, model, cache_responses)
+    cached = _cached_response(key, disk_key)
+    if cached is not None:
+        return cached
+
+    task = _inflight_responses.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_generate_response(prompt, temperature, model))
+        _inflight_responses[key] = task
+        task.add_done_callback(lambda _: _inflight_responses.pop(key, None))
+    result = await asyncio.shield(task)
+
+    if result["status"] == "success":
+        _store_response(key, disk_key, result)
+    return dict(result)
+
+async def generate_responses_parallel(
+    prompt, temperatures, model="llama3-70b-8192", cache_responses=False
+):
+    """Generate responses concurrently for all temperatures."""
+    results = await asyncio.gather(
+        *[
+            generate_response(prompt, temp, model, cache_responses=cache_responses)
             for temp in temperatures
-        }
+        ],
+        return_exceptions=True,
+    )
 
-        for future in as_completed(future_to_temp):
-            result = future.result()
-            responses.append(result)
-            if result["status"] == "success":
-                print(f"✅ Temperature {result['temperature']}: Success")
-            else:
-                print(f"❌ Temperature {result['temperature']}: {result['response']}")
+    responses = []
+    for temp, result in zip(temperatures, results):
+        if isinstance(result, BaseException):
+            result = {
+                "temperature": temp,
+                "response": f"Error: {result}",
+                "status": "error",
+            }
+        responses.append(result)
+        if result["status"] == "success":
+            print(f"✅ Temperature {result['temperature']}: Success")
+        else:
+            print(f"❌ Temperature {result['temperature']}: {result['response']}")
 
     return sorted(responses, key=lambda x: x["temperature"])
 
-def score_response(prompt, response_text, temperature, model="llama3-70b-8192"):
-    """Score a single response out of 100."""
-    score_prompt = f"""
-    Rate this response to the prompt on a scale of 0-100 considering:
-    - Relevance to the prompt
-    - Clarity and readability
-    - Usefulness and completeness
-    - Creativity (if appropriate)
+def _score_cache_key(model, prompt, response_text, temperature):
+    return _cache_key(
+        "score",
+        model=model,
+        prompt=prompt,
+        response=response_text,
+        temperature=temperature,
+    )
 
-    Prompt: "{prompt}"
-    Response: "{response_text}"
-    Temperature used: {temperature}
+# Scoring instructions go in a fixed leading system message and only the
+# prompt/response payload varies, so every scoring call shares the same prefix
+# and can hit the provider's prompt cache.
+_SCORE_CRITERIA = """considering:
+- Relevance to the prompt
+- Clarity and readability
+- Usefulness and completeness
+- Creativity (if appropriate)"""
 
-    Reply with ONLY the numerical score (0-100).
-    """
+SCORE_RUBRIC = f"""Rate the response to the prompt on a scale of 0-100 {_SCORE_CRITERIA}
+
+Reply with ONLY the numerical score (0-100)."""
+
+BATCH_SCORE_RUBRIC = f"""Rate each numbered response to the prompt on a scale of 0-100 {_SCORE_CRITERIA}
+
+Reply with ONLY a JSON array with one {{"idx": <response number>, "score": <0-100>}} object per response."""
+
+async def score_response(prompt, response_text, temperature, model="llama3-70b-8192"):
+    """Score a single response out of 100, reusing cached scores across runs."""
+    key = _score_cache_key(model, prompt, response_text, temperature)
+    cached = disk_cache.get(key)
+    if cached is not None:
+        return cached
+
+    user_message = (
+        f'Prompt: "{prompt}"\nResponse: "{response_text}"\nTemperature used: {temperature}'
+    )
 
     try:
-        completion = client.chat.completions.create(
+        completion = await _create_completion(
             model=model,
-            messages=[{"role": "user", "content": score_prompt}],
+            messages=[
+                {"role": "system", "content": SCORE_RUBRIC},
+                {"role": "user", "content": user_message},
+            ],
             temperature=0,
             max_tokens=10,
             top_p=1,
@@ -125,182 +721,701 @@ def score_response(prompt, response_text, temperature, model="llama3-70b-8192"):
         )
 
         score_text = completion.choices[0].message.content.strip()
-        match = re.search(r"\b(\d+)\b", score_text)
-        if match:
+        try:
+            score = int(score_text)
+        except ValueError:
+            match = _SCORE_RE.search(score_text)
+            if match is None:
+                # Unparseable reply: score 0 this run, but don't cache it
+                print(f"Error scoring response: no score in {score_text[:50]!r}")
+                return 0
             score = int(match.group(1))
-            return min(100, max(0, score))
-        return 0
+        score = min(100, max(0, score))
     except Exception as e:
         print(f"Error scoring response: {e}")
         return 0
 
-def rank_responses(prompt, responses, model="llama3-70b-8192"):
-    """Score and rank all responses."""
-    successful_responses = [r for r in responses if r["status"] == "success"]
-    error_responses = [r for r in responses if r["status"] == "error"]
+    disk_cache.set(key, score)
+    return score
 
-    if not successful_responses:
-        for response in error_responses:
-            response["score"] = 0
-            response["rank"] = 0
-        return responses
+def _parse_batch_scores(parsed, count):
+    """Map a grader's JSON array onto `count` clamped scores, or None if it doesn't fit.
+
+    Accepts {"idx": n, "score": s} objects (1-based idx, any order) as well as
+    a plain array of integers in response order.
+    """
+    if not isinstance(parsed, list) or len(parsed) != count:
+        return None
+    scores = [None] * count
+    try:
+        for position, item in enumerate(parsed):
+            if isinstance(item, dict):
+                idx, score = int(item["idx"]) - 1, item["score"]
+            else:
+                idx, score = position, item
+            if not 0 <= idx < count:
+                return None
+            scores[idx] = min(100, max(0, int(score)))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return None if None in scores else scores
+
+def _response_digest(text):
+    """Short hash identifying byte-identical responses, so they are scored only once."""
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+async def score_responses(prompt, responses, model="llama3-70b-8192"):
+    """Score several responses to one prompt with a single Groq call.
+
+    Cached scores are reused and identical responses (common at low
+    temperatures) are rated once; the remaining responses are rated together
+    and fall back to one score_response call each if the grader's reply cannot
+    be parsed into exactly one score per response.
+    """
+    keys = [
+        _score_cache_key(model, prompt, r["response"], r["temperature"])
+        for r in responses
+    ]
+    scores = [disk_cache.get(key) for key in keys]
+    pending = [i for i, score in enumerate(scores) if score is None]
+    if not pending:
+        return scores
+
+    duplicates = {}
+    for i in pending:
+        duplicates.setdefault(_response_digest(responses[i]["response"]), []).append(i)
+    groups = list(duplicates.values())
+    unique = [group[0] for group in groups]
+
+    numbered = "\n\n".join(
+        f"[{n}] (temperature {responses[i]['temperature']})\n{responses[i]['response']}"
+        for n, i in enumerate(unique, start=1)
+    )
+    user_message = f'Prompt: "{prompt}"\n\n{numbered}'
 
-    print("📊 Scoring responses...")
+    batch_scores = None
+    try:
+        completion = await _create_completion(
+            model=model,
+            messages=[
+                {"role": "system", "content": BATCH_SCORE_RUBRIC},
+                {"role": "user", "content": user_message},
+            ],
+            temperature=0,
+            max_tokens=max(64, 16 * len(unique)),
+            top_p=1,
+            stream=False,
+        )
+        score_text = completion.choices[0].message.content.strip()
+        match = re.search(r"\[.*\]", score_text, re.S)
+        if match:
+            batch_scores = _parse_batch_scores(_loads_json(match.group(0)), len(unique))
+    except Exception as e:
+        print(f"Error batch scoring responses: {e}")
 
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        future_to_response = {
-            executor.submit(
-                score_response, prompt, r["response"], r["temperature"], model
-            ): r
-            for r in successful_responses
+    if batch_scores is None:
+        print("⚠️  Batch scoring failed, scoring responses individually...")
+        batch_scores = await asyncio.gather(
+            *[
+                score_response(
+                    prompt, responses[i]["response"], responses[i]["temperature"], model
+                )
+                for i in unique
+            ]
+        )
+    else:
+        for group, score in zip(groups, batch_scores):
+            for i in group:
+                disk_cache.set(keys[i], score)
+
+    for group, score in zip(groups, batch_scores):
+        for i in group:
+            scores[i] = score
+    return scores
+
+async def _score_when_done(generation, prompt, temperature, model, scoring):
+    """Await a generation task, then score its response as soon as it is ready.
+
+    `scoring` maps response digests to score tasks shared by every temperature
+    of the same prompt, so an identical response is only rated once.
+    """
+    try:
+        result = await generation
+    except Exception as e:
+        result = {
+            "temperature": temperature,
+            "response": f"Error: {e}",
+            "status": "error",
         }
 
-        for future in as_completed(future_to_response):
-            original_response = future_to_response[future]
-            score = future.result()
-            original_response["score"] = score
-            print(f"📈 Temperature {original_response['temperature']}: Score {score}/100")
+    if result["status"] != "success":
+        print(f"❌ Temperature {result['temperature']}: {result['response']}")
+        result["score"] = 0
+        return result
+
+    print(f"✅ Temperature {result['temperature']}: Success")
+    digest = _response_digest(result["response"])
+    if digest not in scoring:
+        scoring[digest] = asyncio.create_task(
+            score_response(prompt, result["response"], result["temperature"], model)
+        )
+    result["score"] = await scoring[digest]
+    print(f"📈 Temperature {result['temperature']}: Score {result['score']}/100")
+    return result
+
+async def generate_and_score_parallel(
+    prompt,
+    temperatures,
+    model="llama3-70b-8192",
+    batch_scoring=True,
+    cache_responses=False,
+):
+    """Generate and score responses for all temperatures.
+
+    With batch_scoring, all successful responses are rated in one grader call
+    once generation finishes. Otherwise each response is scored by its own call
+    as soon as it is generated.
+    """
+    if not batch_scoring:
+        generations = [
+            asyncio.create_task(
+                generate_response(prompt, temp, model, cache_responses=cache_responses)
+            )
+            for temp in temperatures
+        ]
+        scoring = {}
+        score_tasks = [
+            asyncio.create_task(_score_when_done(generation, prompt, temp, model, scoring))
+            for generation, temp in zip(generations, temperatures)
+        ]
+        responses = await asyncio.gather(*score_tasks)
+        return sorted(responses, key=lambda x: x["temperature"])
+
+    responses = await generate_responses_parallel(
+        prompt, temperatures, model=model, cache_responses=cache_responses
+    )
+    await score_generated_responses(prompt, responses, model=model)
+    return responses
 
-    for response in error_responses:
+async def score_generated_responses(
+    prompt, responses, model="llama3-70b-8192", batch_scoring=True
+):
+    """Attach a score to every generated response.
+
+    With batch_scoring the successful ones are rated in one call; otherwise
+    each distinct response gets its own score_response call.
+    """
+    successful_responses = [r for r in responses if r["status"] == "success"]
+    for response in responses:
         response["score"] = 0
 
-    all_responses = successful_responses + error_responses
-    ranked_responses = sorted(all_responses, key=lambda x: x["score"], reverse=True)
+    if successful_responses:
+        print("📊 Scoring responses...")
+        if batch_scoring:
+            scores = await score_responses(prompt, successful_responses, model=model)
+        else:
+            scoring = {}
+            for response in successful_responses:
+                digest = _response_digest(response["response"])
+                if digest not in scoring:
+                    scoring[digest] = asyncio.ensure_future(
+                        score_response(
+                            prompt, response["response"], response["temperature"], model
+                        )
+                    )
+            scores = await asyncio.gather(
+                *[scoring[_response_digest(r["response"])] for r in successful_responses]
+            )
+        for response, score in zip(successful_responses, scores):
+            response["score"] = score
+            print(f"📈 Temperature {response['temperature']}: Score {score}/100")
+
+PROMPT_BATCH_INSTRUCTIONS = (
+    "Answer each numbered prompt below independently, as if it were the only one."
+    ' Return ONLY a JSON object of the form {"responses": [{"idx": <prompt number>,'
+    ' "text": "<your answer>"}, ...]} with one entry per prompt.'
+)
+
+# Completion budget for one batched call; prompt_batch_size is clamped so each
+# prompt still gets GENERATION_MAX_TOKENS within it
+BATCH_MAX_COMPLETION_TOKENS = 4096
+
+async def generate_batched(
+    prompts_chunk, temperature, model="llama3-70b-8192", cache_responses=False
+):
+    """Answer several prompts at one temperature with a single JSON-mode Groq call.
+
+    Returns one response dict per prompt, in order; prompts missing from the
+    reply (or all of them, if the call fails) are marked as errors. Prompts
+    already cached or in flight (see generate_response) are not sent again,
+    and successful answers are cached the same way.
+    """
+    results = [None] * len(prompts_chunk)
+    waiting = {}
+    pending = {}
+    for position, prompt in enumerate(prompts_chunk):
+        key = (model, prompt, temperature)
+        disk_key = _generation_disk_key(prompt, temperature, model, cache_responses)
+        cached = _cached_response(key, disk_key)
+        if cached is not None:
+            results[position] = cached
+        elif key in _inflight_responses:
+            waiting[position] = _inflight_responses[key]
+        else:
+            future = asyncio.get_running_loop().create_future()
+            _inflight_responses[key] = future
+            future.add_done_callback(lambda _, key=key: _inflight_responses.pop(key, None))
+            pending[position] = (key, disk_key, future)
+
+    try:
+        if pending:
+            sent = list(pending)
+            for position, result in zip(
+                sent,
+                await _generate_batch(
+                    [prompts_chunk[p] for p in sent], temperature, model
+                ),
+            ):
+                key, disk_key, future = pending[position]
+                if result["status"] == "success":
+                    _store_response(key, disk_key, result)
+                future.set_result(result)
+                results[position] = dict(result)
+    finally:
+        for _, _, future in pending.values():
+            future.cancel()
+
+    for position, task in waiting.items():
+        results[position] = dict(await asyncio.shield(task))
+    return results
+
+async def _generate_batch(prompts_chunk, temperature, model):
+    """Send one JSON-mode Groq call answering every prompt in the chunk."""
+    numbered = "\n\n".join(f"{n}. {p}" for n, p in enumerate(prompts_chunk, start=1))
+    texts = {}
+    error = "missing from batched reply"
+    try:
+        completion = await _create_completion(
+            model=model,
+            messages=[{"role": "user", "content": f"{PROMPT_BATCH_INSTRUCTIONS}\n\n{numbered}"}],
+            temperature=temperature,
+            max_tokens=min(
+                BATCH_MAX_COMPLETION_TOKENS, GENERATION_MAX_TOKENS * len(prompts_chunk)
+            ),
+            top_p=1,
+            stream=False,
+            response_format={"type": "json_object"},
+        )
+        for item in _loads_json(completion.choices[0].message.content)["responses"]:
+            texts[int(item["idx"])] = str(item["text"]).strip()
+    except Exception as e:
+        error = str(e)
+
+    return [
+        {"temperature": temperature, "response": texts[n], "status": "success"}
+        if texts.get(n)
+        else {"temperature": temperature, "response": f"Error: {error}", "status": "error"}
+        for n in range(1, len(prompts_chunk) + 1)
+    ]
+
+def start_prompt_batches(
+    prompts,
+    temperatures,
+    model="llama3-70b-8192",
+    batch_size=4,
+    cache_responses=False,
+    skip=None,
+):
+    """Launch batched generation for all prompts and return one awaitable per prompt.
+
+    Prompts are sorted by length before chunking so each request packs prompts
+    of similar size. Each returned coroutine resolves to that prompt's responses
+    sorted by temperature. batch_size is clamped to what fits in
+    BATCH_MAX_COMPLETION_TOKENS. `skip`, if given, holds one set of
+    temperatures per prompt that are already answered and are left out of
+    that temperature's batches.
+    """
+    max_batch_size = max(1, BATCH_MAX_COMPLETION_TOKENS // GENERATION_MAX_TOKENS)
+    if batch_size > max_batch_size:
+        print(f"⚠️  prompt_batch_size {batch_size} is too large; using {max_batch_size}.")
+        batch_size = max_batch_size
+    order = sorted(range(len(prompts)), key=lambda i: len(prompts[i]))
+    parts = [[] for _ in prompts]
+    for temp in temperatures:
+        todo = [i for i in order if skip is None or temp not in skip[i]]
+        for start in range(0, len(todo), batch_size):
+            chunk = todo[start:start + batch_size]
+            task = asyncio.create_task(
+                generate_batched(
+                    [prompts[i] for i in chunk], temp, model, cache_responses=cache_responses
+                )
+            )
+            for position, i in enumerate(chunk):
+                parts[i].append((task, position))
+    return [_collect_batched(prompt_parts) for prompt_parts in parts]
+
+async def _collect_batched(parts):
+    """Pick one prompt's responses out of the (batch task, position) pairs holding them."""
+    batches = await asyncio.gather(*[task for task, _ in parts])
+    responses = [dict(results[position]) for results, (_, position) in zip(batches, parts)]
+    for result in responses:
+        if result["status"] == "success":
+            print(f"✅ Temperature {result['temperature']}: Success")
+        else:
+            print(f"❌ Temperature {result['temperature']}: {result['response']}")
+    return sorted(responses, key=lambda x: x["temperature"])
+
+def _rank_key(response):
+    # Successes win ties against errors at score 0
+    return response["score"], response["status"] == "success"
+
+# Above this many responses per prompt, only the top 3 are ordered by score
+FULL_RANKING_MAX_RESPONSES = 64
+# Rank given to responses outside the podium that were not ordered by score
+UNRANKED = 999
+
+def rank_responses(responses):
+    """Rank already-scored responses, best first.
+
+    Beyond FULL_RANKING_MAX_RESPONSES only the podium is selected with a heap
+    and ranked 1-3; the remaining responses follow in temperature order,
+    successes before errors, with rank UNRANKED.
+    """
+    any_success = False
+    for response in responses:
+        if response["status"] == "success":
+            any_success = True
+        else:
+            response["score"] = 0
+
+    if not any_success:
+        for response in responses:
+            response["rank"] = 0
+        return responses
+
+    if len(responses) > FULL_RANKING_MAX_RESPONSES:
+        # Only the podium is highlighted in the report; keep the rest in input order
+        podium = heapq.nlargest(3, responses, key=_rank_key)
+        podium_ids = {id(r) for r in podium}
+        rest = [r for r in responses if id(r) not in podium_ids]
+        for response in rest:
+            response["rank"] = UNRANKED
+        ranked_responses = (
+            podium
+            + [r for r in rest if r["status"] == "success"]
+            + [r for r in rest if r["status"] != "success"]
+        )
+    else:
+        podium = ranked_responses = sorted(responses, key=_rank_key, reverse=True)
 
-    for i, response in enumerate(ranked_responses):
-        response["rank"] = i + 1
+    for i, response in enumerate(podium, start=1):
+        response["rank"] = i
 
     return ranked_responses
 
-def generate_html_report(prompts_data, overall_stats, model):
-    """Generate an HTML report with model name included."""
-    html_content = f"""
+_CSS = """
+            * { margin: 0; padding: 0; box-sizing: border-box; }
+            body { font-family: sans-serif; background: #f4f7f6; padding: 20px; }
+            .container { max-width: 1000px; margin: 0 auto; background: white; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); overflow: hidden; }
+            .header { background: #4CAF50; color: white; padding: 20px; text-align: center; }
+            .header h1 { font-size: 1.8rem; margin-bottom: 5px; }
+            .header p { font-size: 1rem; }
+            .overall-stats { display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 15px; padding: 20px; background: #e8f5e9; border-bottom: 1px solid #dcdcdc; }
+            .stat-card { background: white; padding: 15px; border-radius: 5px; text-align: center; box-shadow: 0 2px 5px rgba(0,0,0,0.05); }
+            .stat-number { font-size: 1.5rem; font-weight: bold; color: #4CAF50; }
+            .stat-label { color: #555; font-size: 0.8rem; margin-top: 5px; }
+            .prompt-section { margin-bottom: 30px; border-bottom: 1px solid #eee; padding-bottom: 20px; }
+            .prompt-section:last-child { border-bottom: none; }
+            .prompt-header { background: #f0f0f0; padding: 15px; margin: 0 20px 15px 20px; border-radius: 5px; }
+            .prompt-title { font-size: 1.1rem; font-weight: bold; margin-bottom: 10px; }
+            .prompt-text { font-size: 0.95rem; line-height: 1.5; }
+            .prompt-stats { display: flex; justify-content: space-around; margin: 0 20px 15px 20px; padding: 15px; background: #f8f8f8; border-radius: 5px; }
+            .prompt-stat { text-align: center; }
+            .prompt-stat-number { font-size: 1.2rem; font-weight: bold; color: #4CAF50; }
+            .prompt-stat-label { color: #777; font-size: 0.75rem; margin-top: 5px; }
+            .responses-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 15px; padding: 0 20px; }
+            .response-card { background: white; border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); overflow: hidden; border: 1px solid #ddd; }
+            .response-card.rank-1 { border-color: #ffd700; }
+            .response-card.rank-2 { border-color: #c0c0c0; }
+            .response-card.rank-3 { border-color: #cd7f32; }
+            .response-header { display: flex; justify-content: space-between; align-items: center; padding: 10px 15px; background: #f0f0f0; border-bottom: 1px solid #ddd; }
+            .rank-badge { background: #4CAF50; color: white; padding: 4px 8px; border-radius: 12px; font-weight: bold; font-size: 0.8rem; }
+            .rank-1 .rank-badge { background: #ffd700; color: #333; }
+            .rank-2 .rank-badge { background: #c0c0c0; color: #333; }
+            .rank-3 .rank-badge { background: #cd7f32; color: white; }
+            .temp-score { display: flex; gap: 8px; align-items: center; font-size: 0.8rem; }
+            .temperature { background: #e0e0e0; padding: 2px 6px; border-radius: 4px; font-weight: 500; color: #444; }
+            .score { font-weight: bold; color: #4CAF50; }
+            .response-content { padding: 15px; line-height: 1.5; color: #333; font-size: 0.9rem; }
+            .response-text { display: -webkit-box; -webkit-box-orient: vertical; -webkit-line-clamp: 4; line-clamp: 4; overflow: hidden; }
+            .response-card.expanded .response-text { display: block; -webkit-line-clamp: unset; line-clamp: unset; }
+            .show-more-btn { background: none; border: none; color: #1976d2; cursor: pointer; font-size: 0.9rem; margin-top: 8px; text-decoration: underline; }
+            .error-response { background: #ffebee; color: #c62828; border-color: #ef9a9a; }
+            .timestamp { text-align: center; color: #777; font-size: 0.8rem; padding: 15px; background: #f0f0f0; }
+"""
+
+# Versioned by content, so a report always links the stylesheet it was built with
+CSS_FILENAME = f"autotemp-{hashlib.sha256(_CSS.encode('utf-8')).hexdigest()[:12]}.css"
+
+_TOGGLE_SCRIPT = """<script>
+        function toggleResponse(btn) {
+            var expanded = btn.closest('.response-card').classList.toggle('expanded');
+            btn.textContent = expanded ? 'Show less' : 'Show more';
+        }
+        // Hide the toggle on responses that fit within the clamp anyway
+        document.addEventListener('DOMContentLoaded', function () {
+            document.querySelectorAll('.response-text').forEach(function (text) {
+                if (text.scrollHeight <= text.clientHeight) {
+                    text.parentNode.querySelector('.show-more-btn').style.display = 'none';
+                }
+            });
+        });
+        </script>"""
+
+_REPORT_HEADER_TEMPLATE = """
     <!DOCTYPE html>
-    <html lang=\"en\">
+    <html lang="en">
     <head>
-        <meta charset=\"UTF-8\">
-        <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        {{HEAD_EXTRA}}
         <title>AutoTemp Multi-Prompt Analysis</title>
-        <style>
-            * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-            body {{ font-family: sans-serif; background: #f4f7f6; padding: 20px; }}
-            .container {{ max-width: 1000px; margin: 0 auto; background: white; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); overflow: hidden; }}
-            .header {{ background: #4CAF50; color: white; padding: 20px; text-align: center; }}
-            .header h1 {{ font-size: 1.8rem; margin-bottom: 5px; }}
-            .header p {{ font-size: 1rem; }}
-            .overall-stats {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 15px; padding: 20px; background: #e8f5e9; border-bottom: 1px solid #dcdcdc; }}
-            .stat-card {{ background: white; padding: 15px; border-radius: 5px; text-align: center; box-shadow: 0 2px 5px rgba(0,0,0,0.05); }}
-            .stat-number {{ font-size: 1.5rem; font-weight: bold; color: #4CAF50; }}
-            .stat-label {{ color: #555; font-size: 0.8rem; margin-top: 5px; }}
-            .prompt-section {{ margin-bottom: 30px; border-bottom: 1px solid #eee; padding-bottom: 20px; }}
-            .prompt-section:last-child {{ border-bottom: none; }}
-            .prompt-header {{ background: #f0f0f0; padding: 15px; margin: 0 20px 15px 20px; border-radius: 5px; }}
-            .prompt-title {{ font-size: 1.1rem; font-weight: bold; margin-bottom: 10px; }}
-            .prompt-text {{ font-size: 0.95rem; line-height: 1.5; }}
-            .prompt-stats {{ display: flex; justify-content: space-around; margin: 0 20px 15px 20px; padding: 15px; background: #f8f8f8; border-radius: 5px; }}
-            .prompt-stat {{ text-align: center; }}
-            .prompt-stat-number {{ font-size: 1.2rem; font-weight: bold; color: #4CAF50; }}
-            .prompt-stat-label {{ color: #777; font-size: 0.75rem; margin-top: 5px; }}
-            .responses-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 15px; padding: 0 20px; }}
-            .response-card {{ background: white; border-radius: 5px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); overflow: hidden; border: 1px solid #ddd; }}
-            .response-card.rank-1 {{ border-color: #ffd700; }}
-            .response-card.rank-2 {{ border-color: #c0c0c0; }}
-            .response-card.rank-3 {{ border-color: #cd7f32; }}
-            .response-header {{ display: flex; justify-content: space-between; align-items: center; padding: 10px 15px; background: #f0f0f0; border-bottom: 1px solid #ddd; }}
-            .rank-badge {{ background: #4CAF50; color: white; padding: 4px 8px; border-radius: 12px; font-weight: bold; font-size: 0.8rem; }}
-            .rank-1 .rank-badge {{ background: #ffd700; color: #333; }}
-            .rank-2 .rank-badge {{ background: #c0c0c0; color: #333; }}
-            .rank-3 .rank-badge {{ background: #cd7f32; color: white; }}
-            .temp-score {{ display: flex; gap: 8px; align-items: center; font-size: 0.8rem; }}
-            .temperature {{ background: #e0e0e0; padding: 2px 6px; border-radius: 4px; font-weight: 500; color: #444; }}
-            .score {{ font-weight: bold; color: #4CAF50; }}
-            .response-content {{ padding: 15px; line-height: 1.5; color: #333; font-size: 0.9rem; }}
-            .response-preview {{ display: block; }}
-            .response-full {{ display: none; }}
-            .show-more-btn {{ background: none; border: none; color: #1976d2; cursor: pointer; font-size: 0.9rem; margin-top: 8px; text-decoration: underline; }}
-            .error-response {{ background: #ffebee; color: #c62828; border-color: #ef9a9a; }}
-            .timestamp {{ text-align: center; color: #777; font-size: 0.8rem; padding: 15px; background: #f0f0f0; }}
-        </style>
-        <script>
-        function toggleResponse(id) {{
-            var preview = document.getElementById('preview-' + id);
-            var full = document.getElementById('full-' + id);
-            var btn = document.getElementById('btn-' + id);
-            if (full.style.display === 'none') {{
-                full.style.display = 'block';
-                preview.style.display = 'none';
-                btn.textContent = 'Show less';
-            }} else {{
-                full.style.display = 'none';
-                preview.style.display = 'block';
-                btn.textContent = 'Show more';
-            }}
-        }}
-        </script>
+        {{STYLESHEET}}
+        {{SCRIPT}}
     </head>
     <body>
         <div class="container">
             <div class="header">
                 <h1>AutoTemp Multi-Prompt Analysis</h1>
-                <p>AI Response Ranking Across Multiple Prompts & Temperatures (Model: {model})</p>
+                <p>AI Response Ranking Across Multiple Prompts & Temperatures (Model: {{MODEL}})</p>
             </div>
 
-            <div class="overall-stats">
+            {{OVERALL_STATS}}
+    """
+
+_OVERALL_STATS_TEMPLATE = """<div class="overall-stats">
                 <div class="stat-card">
-                    <span class="stat-number">{overall_stats["total_prompts"]}</span>
+                    <span class="stat-number">{{TOTAL_PROMPTS}}</span>
                     <div class="stat-label">Total Prompts</div>
                 </div>
                 <div class="stat-card">
-                    <span class="stat-number">{overall_stats["total_responses"]}</span>
+                    <span class="stat-number">{{TOTAL_RESPONSES}}</span>
                     <div class="stat-label">Total Responses</div>
                 </div>
                 <div class="stat-card">
-                    <span class="stat-number">{overall_stats["temps_tested"]}</span>
+                    <span class="stat-number">{{TEMPS_TESTED}}</span>
                     <div class="stat-label">Temperatures Tested</div>
                 </div>
                 <div class="stat-card">
-                    <span class="stat-number">{overall_stats["avg_best_temp"]}</span>
+                    <span class="stat-number">{{AVG_BEST_TEMP}}</span>
                     <div class="stat-label">Avg Best Temperature</div>
                 </div>
                 <div class="stat-card">
-                    <span class="stat-number">{overall_stats["success_rate"]}%</span>
+                    <span class="stat-number">{{SUCCESS_RATE}}%</span>
                     <div class="stat-label">Overall Success Rate</div>
                 </div>
             </div>
+    """
 
-            {"".join([_generate_prompt_section(i, pd) for i, pd in enumerate(prompts_data)])}
+# Shown at the top of a live report until the final report replaces it
+_LIVE_PROGRESS = """<div class="overall-stats">
+                <div class="stat-card">
+                    <span class="stat-number">⏳</span>
+                    <div class="stat-label">Analysis in progress, prompts appear as they finish</div>
+                </div>
+            </div>
+    """
+
+_LIVE_REFRESH = '<meta http-equiv="refresh" content="5">'
 
+_REPORT_FOOTER_TEMPLATE = """
             <div class="timestamp">
-                Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")} | Model: {model} | Temperatures tested: {overall_stats["temperature_range"]}
+                Generated on {{GENERATED_AT}} | Model: {{MODEL}} | Temperatures tested: {{TEMPERATURE_RANGE}}
             </div>
         </div>
     </body>
     </html>
     """
-    return html_content
+
+def _compile_template(template, static_values=None):
+    """Split a {{KEY}} template once into alternating [literal, key, ..., literal].
+
+    Placeholders found in static_values are substituted here and the literals
+    around them merged, so rendering only touches the dynamic placeholders.
+    """
+    static_values = static_values or {}
+    segments = re.split(r"(\{\{[A-Z_]+\}\})", template)
+    parts = [segments[0]]
+    for i in range(1, len(segments), 2):
+        key = segments[i][2:-2]
+        if key in static_values:
+            parts[-1] += static_values[key] + segments[i + 1]
+        else:
+            parts.extend([key, segments[i + 1]])
+    return parts
+
+_HEADER_PARTS = _compile_template(
+    _REPORT_HEADER_TEMPLATE,
+    {"SCRIPT": _TOGGLE_SCRIPT, "STYLESHEET": f"<style>{_CSS}        </style>"},
+)
+
+# Variant referencing an external stylesheet written next to the report
+_LINKED_CSS_HEADER_PARTS = _compile_template(
+    _REPORT_HEADER_TEMPLATE,
+    {
+        "SCRIPT": _TOGGLE_SCRIPT,
+        "STYLESHEET": f'<link rel="stylesheet" href="{CSS_FILENAME}">',
+    },
+)
+
+_OVERALL_STATS_PARTS = _compile_template(_OVERALL_STATS_TEMPLATE)
+_FOOTER_PARTS = _compile_template(_REPORT_FOOTER_TEMPLATE)
+
+def write_css_file(directory):
+    """Write the report stylesheet into directory once and return its path.
+
+    CSS_FILENAME carries a hash of the stylesheet, so an existing file always
+    has the current contents; older versions stay for the reports linking them.
+    """
+    css_path = os.path.join(directory, CSS_FILENAME)
+    if not os.path.exists(css_path):
+        with open(css_path, "w", encoding="utf-8") as f:
+            f.write(_CSS)
+    return css_path
+
+def _render_template(template_parts, values):
+    """Fill a compiled template into a list of chunks.
+
+    Only the placeholders present in the template are looked up.
+    """
+    parts = []
+    for i, part in enumerate(template_parts):
+        if not i % 2:
+            if part:
+                parts.append(part)
+        else:
+            parts.append(str(values[part]))
+    return parts
+
+def _render_header(model, overall_stats=None, link_css=False):
+    """Render the page head and banner; without stats, render the live-report variant."""
+    if overall_stats is None:
+        head_extra, stats_html = _LIVE_REFRESH, _LIVE_PROGRESS
+    else:
+        head_extra = ""
+        stats_html = "".join(
+            _render_template(
+                _OVERALL_STATS_PARTS,
+                {
+                    "TOTAL_PROMPTS": overall_stats["total_prompts"],
+                    "TOTAL_RESPONSES": overall_stats["total_responses"],
+                    "TEMPS_TESTED": overall_stats["temps_tested"],
+                    "AVG_BEST_TEMP": overall_stats["avg_best_temp"],
+                    "SUCCESS_RATE": overall_stats["success_rate"],
+                },
+            )
+        )
+    header_parts = _LINKED_CSS_HEADER_PARTS if link_css else _HEADER_PARTS
+    return _render_template(
+        header_parts,
+        {"HEAD_EXTRA": head_extra, "MODEL": model, "OVERALL_STATS": stats_html},
+    )
+
+# Below this many prompts, process start-up costs more than rendering serially
+PARALLEL_RENDER_MIN_PROMPTS = 50
+
+def iter_html_report(prompts_data, overall_stats, model, link_css=False):
+    """Yield the report piece by piece: header, one chunk per prompt, footer.
+
+    Large reports render their prompt sections across worker processes.
+    """
+    yield from _render_header(model, overall_stats, link_css=link_css)
+    if len(prompts_data) >= PARALLEL_RENDER_MIN_PROMPTS:
+        chunksize = max(1, len(prompts_data) // (4 * (os.cpu_count() or 1)))
+        with ProcessPoolExecutor() as executor:
+            yield from executor.map(
+                _generate_prompt_section,
+                range(len(prompts_data)),
+                prompts_data,
+                chunksize=chunksize,
+            )
+    else:
+        for i, pd in enumerate(prompts_data):
+            yield _generate_prompt_section(i, pd)
+    yield from _render_template(
+        _FOOTER_PARTS,
+        {
+            "GENERATED_AT": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "MODEL": model,
+            "TEMPERATURE_RANGE": overall_stats["temperature_range"],
+        },
+    )
+
+def stream_html_report(fp, prompts_data, overall_stats, model, link_css=False):
+    """Write the HTML report to an open text file without building it in memory.
+
+    With link_css, the page references CSS_FILENAME instead of inlining the
+    stylesheet; the caller is responsible for writing it via write_css_file.
+    """
+    for chunk in iter_html_report(prompts_data, overall_stats, model, link_css):
+        fp.write(chunk)
+
+def generate_html_report(prompts_data, overall_stats, model, link_css=False):
+    """Generate an HTML report with model name included."""
+    return "".join(iter_html_report(prompts_data, overall_stats, model, link_css))
+
+# Large buffer so a streamed report reaches the OS in a few big writes
+REPORT_WRITE_BUFFER = 1 << 20
+
+def _open_in_browser(path):
+    """Open a report in the browser from a background thread so the caller never waits."""
+    threading.Thread(target=webbrowser.open, args=(f"file://{path}",)).start()
+
+def _write_all(fd, text):
+    """Encode text once and write it to a raw file descriptor."""
+    data = memoryview(text.encode("utf-8"))
+    while data:
+        data = data[os.write(fd, data):]
+
+def _prompt_stats(responses):
+    """Count successes and average their scores in a single pass."""
+    successes = 0
+    score_sum = 0
+    for r in responses:
+        if r["status"] == "success":
+            successes += 1
+            score_sum += r["score"]
+    return {
+        "successes": successes,
+        "avg_score": score_sum / successes if successes else 0,
+    }
+
+def _make_prompt_data(prompt, ranked_responses):
+    """Bundle a prompt with its ranked responses and precomputed stats."""
+    return {
+        "prompt": prompt,
+        "responses": ranked_responses,
+        "stats": _prompt_stats(ranked_responses),
+    }
 
 def _generate_prompt_section(index, prompt_data):
     """Helper function to generate HTML for a single prompt section."""
     prompt = prompt_data["prompt"]
     responses = prompt_data["responses"]
+    stats = prompt_data.get("stats") or _prompt_stats(responses)
 
-    response_cards = "".join([_generate_response_card(r) for r in responses])
-
-    successful = [r for r in responses if r["status"] == "success"]
     best_temp = responses[0]["temperature"] if responses else 0
     best_score = responses[0]["score"] if responses else 0
-    avg_score = (
-        sum(r["score"] for r in successful) / len(successful) if successful else 0
-    )
+    avg_score = stats["avg_score"]
 
-    return f"""
+    parts = [f"""
     <div class="prompt-section">
         <div class="prompt-header">
             <div class="prompt-title">
                 Prompt #{index+1}
             </div>
             <div class="prompt-text">
-                {prompt}
+                {_escape_multiline(prompt)}
             </div>
         </div>
 
@@ -318,19 +1433,22 @@ def _generate_prompt_section(index, prompt_data):
                 <div class="prompt-stat-label">Average Score</div>
             </div>
             <div class="prompt-stat">
-                <div class="prompt-stat-number">{len(successful)}/{len(responses)}</div>
+                <div class="prompt-stat-number">{stats["successes"]}/{len(responses)}</div>
                 <div class="prompt-stat-label">Success Rate</div>
             </div>
         </div>
 
         <div class="responses-grid">
-            {response_cards}
+    """]
+    parts.extend(_generate_response_card(r) for r in responses)
+    parts.append("""
         </div>
     </div>
-    """
+    """)
+    return "".join(parts)
 
 def _generate_response_card(response):
-    """Helper function to generate HTML for a single response card with show more/less dropdown."""
+    """Helper function to generate HTML for a single response card with show more/less toggle."""
     rank_class = f"rank-{response['rank']}" if response["rank"] <= 3 else ""
     error_class = "error-response" if response["status"] == "error" else ""
     emoji = (
@@ -342,15 +1460,13 @@ def _generate_response_card(response):
         if response["rank"] == 3
         else ""
     )
-    # Unique ID for toggling
-    unique_id = f"{response['temperature']}-{response['rank']}"
-    full_text = response['response'].replace('\n', '<br>')
-    preview_text = full_text[:200] + ("..." if len(full_text) > 200 else "")
+    # The collapsed view is a CSS line clamp, so the body is only emitted once;
+    # the page script hides the toggle where nothing was clipped
     return f"""
     <div class=\"response-card {rank_class} {error_class}\">
         <div class=\"response-header\">
             <div class=\"rank-badge\">
-                #{response['rank']} {emoji}
+                {f"#{response['rank']}" if response["rank"] != UNRANKED else "Unranked"} {emoji}
             </div>
             <div class=\"temp-score\">
                 <div class=\"temperature\">T: {response['temperature']}</div>
@@ -358,15 +1474,26 @@ def _generate_response_card(response):
             </div>
         </div>
         <div class=\"response-content\">
-            <span class=\"response-preview\" id=\"preview-{unique_id}\">{preview_text}</span>
-            <span class=\"response-full\" id=\"full-{unique_id}\">{full_text}</span>
-            <button class=\"show-more-btn\" id=\"btn-{unique_id}\" onclick=\"toggleResponse('{unique_id}')\">Show more</button>
+            <div class=\"response-text\">{_escape_multiline(response['response'])}</div>
+            <button class=\"show-more-btn\" onclick=\"toggleResponse(this)\">Show more</button>
         </div>
     </div>
     """
 
-def autotemp_multi_prompt(
-    prompts, temperatures, model="llama3-70b-8192", open_browser=True
+async def autotemp_multi_prompt(
+    prompts,
+    temperatures,
+    model="llama3-70b-8192",
+    open_browser=True,
+    batch_scoring=True,
+    link_css=False,
+    max_concurrency=DEFAULT_MAX_CONCURRENCY,
+    rpm=None,
+    live_report=False,
+    cache_responses=False,
+    use_semantic_cache=False,
+    prompt_batch_size=None,
+    checkpoint_path=None,
 ):
     """
     Generate responses for multiple prompts and create a comprehensive HTML report.
@@ -376,6 +1503,23 @@ def autotemp_multi_prompt(
         temperatures (list): A list of floats representing temperatures to test.
         model (str): The name of the Groq model to use.
         open_browser (bool): If True, opens the generated HTML report in a browser.
+        batch_scoring (bool): If True, scores all responses to a prompt in one call.
+        link_css (bool): If True, links a shared CSS_FILENAME next to the report
+            instead of inlining the stylesheet.
+        max_concurrency (int): Maximum number of Groq requests in flight at once.
+        rpm (int): Optional requests-per-minute cap matching the model's rate limit.
+        live_report (bool): If True, opens the report immediately and appends each
+            prompt's results as it finishes; the final report replaces it at the end.
+        cache_responses (bool): If True, persist generated responses at every
+            temperature, not only near-deterministic ones, in the on-disk cache.
+        use_semantic_cache (bool): If True and faiss/sentence-transformers are
+            installed, reuse ranked responses from a near-identical earlier prompt.
+        prompt_batch_size (int): If set above 1, answer up to this many prompts
+            per Groq call at each temperature (JSON mode) instead of one call each;
+            clamped to fit BATCH_MAX_COMPLETION_TOKENS.
+        checkpoint_path (str): If set, append each scored response to this JSONL
+            file (e.g. CHECKPOINT_PATH) and skip prompt/temperature pairs it
+            already holds for this model, so an interrupted run can be resumed.
 
     Returns:
         tuple: A tuple containing:
@@ -386,25 +1530,135 @@ def autotemp_multi_prompt(
     print(f"Temperatures: {temperatures}")
     print(f"Model: {model}")
 
-    all_prompts_data = []
-    total_responses_generated = 0
-    total_successful_responses = 0
-    all_best_temps = []
+    configure_limits(max_concurrency, rpm)
+
+    if use_semantic_cache and semantic_cache is None:
+        print("⚠️  Semantic cache needs faiss and sentence-transformers; skipping it.")
+    semantic = semantic_cache if use_semantic_cache else None
+
+    checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+
+    # Resolve checkpoint and semantic-cache hits before anything is sent, so
+    # only prompts that still need generating go into batches
+    restored = [
+        checkpoint.restore(prompt, temperatures, model) if checkpoint else []
+        for prompt in prompts
+    ]
+    reused = [None] * len(prompts)
+    if semantic is not None:
+        for i, prompt in enumerate(prompts):
+            if len(restored[i]) < len(temperatures):
+                reused[i] = await asyncio.to_thread(
+                    semantic.lookup, prompt, model, temperatures
+                )
 
-    for i, prompt in enumerate(prompts):
+    async def process_prompt(i, prompt):
         print(f"\n--- Processing Prompt {i+1}/{len(prompts)} ---")
         print(f"Prompt: {prompt[:70]}...")
 
-        responses = generate_responses_parallel(prompt, temperatures, model=model)
-        ranked_responses = rank_responses(prompt, responses, model=model)
+        if len(restored[i]) == len(temperatures):
+            print(f"⏩ Prompt {i+1}: all temperatures restored from checkpoint")
+            return i, restored[i], rank_responses(restored[i])
 
-        all_prompts_data.append({"prompt": prompt, "responses": ranked_responses})
+        if reused[i] is not None:
+            print(f"♻️  Prompt {i+1}: reusing results from a similar earlier prompt")
+            return i, reused[i], rank_responses(reused[i])
 
-        total_responses_generated += len(responses)
-        total_successful_responses += len(
-            [r for r in responses if r["status"] == "success"]
+        if batched is not None:
+            # Batches already leave out temperatures restored from the checkpoint
+            responses = await batched[i]
+            await score_generated_responses(
+                prompt, responses, model=model, batch_scoring=batch_scoring
+            )
+        else:
+            done = {r["temperature"] for r in restored[i]}
+            remaining = [t for t in temperatures if t not in done]
+            responses = await generate_and_score_parallel(
+                prompt,
+                remaining,
+                model=model,
+                batch_scoring=batch_scoring,
+                cache_responses=cache_responses,
+            )
+        if checkpoint is not None:
+            checkpoint.record(prompt, model, responses)
+            responses = sorted(restored[i] + responses, key=lambda x: x["temperature"])
+        ranked_responses = rank_responses(responses)
+        if semantic is not None:
+            await asyncio.to_thread(semantic.add, prompt, model, ranked_responses)
+        return i, responses, ranked_responses
+
+    batched = None
+    if prompt_batch_size and prompt_batch_size > 1:
+        pending = [
+            i
+            for i in range(len(prompts))
+            if len(restored[i]) < len(temperatures) and reused[i] is None
+        ]
+        batched = dict(
+            zip(
+                pending,
+                start_prompt_batches(
+                    [prompts[i] for i in pending],
+                    temperatures,
+                    model=model,
+                    batch_size=prompt_batch_size,
+                    cache_responses=cache_responses,
+                    skip=[{r["temperature"] for r in restored[i]} for i in pending],
+                ),
+            )
         )
 
+    # Longest prompts first (LPT), so the slowest work is not left queued behind
+    # the concurrency cap at the end; results are re-ordered by index below
+    schedule = sorted(range(len(prompts)), key=lambda i: len(prompts[i]), reverse=True)
+    tasks = [asyncio.create_task(process_prompt(i, prompts[i])) for i in schedule]
+
+    html_fd = None
+    if live_report:
+        html_fd, html_file = tempfile.mkstemp(suffix=".html")
+        if link_css:
+            write_css_file(os.path.dirname(html_file))
+        _write_all(html_fd, "".join(_render_header(model, link_css=link_css)))
+        print(f"📡 Live report: {html_file}")
+        if open_browser:
+            _open_in_browser(html_file)
+
+    try:
+        processed = [None] * len(prompts)
+        for next_done in asyncio.as_completed(tasks):
+            i, responses, ranked_responses = await next_done
+            processed[i] = (responses, ranked_responses)
+            if html_fd is not None:
+                _write_all(
+                    html_fd,
+                    _generate_prompt_section(
+                        i, _make_prompt_data(prompts[i], ranked_responses)
+                    ),
+                )
+    except BaseException:
+        if html_fd is not None:
+            os.close(html_fd)
+        raise
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if semantic is not None:
+        await asyncio.to_thread(semantic.save)
+
+    all_prompts_data = []
+    total_responses_generated = 0
+    total_successful_responses = 0
+    all_best_temps = []
+
+    for prompt, (responses, ranked_responses) in zip(prompts, processed):
+        prompt_data = _make_prompt_data(prompt, ranked_responses)
+        all_prompts_data.append(prompt_data)
+
+        total_responses_generated += len(responses)
+        total_successful_responses += prompt_data["stats"]["successes"]
+
         if ranked_responses and ranked_responses[0]["status"] == "success":
             all_best_temps.append(ranked_responses[0]["temperature"])
 
@@ -424,19 +1678,53 @@ def autotemp_multi_prompt(
     }
 
     print("\n📊 Generating HTML report...")
-    html_content = generate_html_report(all_prompts_data, overall_stats, model)
+    live_file = None
+    if html_fd is None:
+        html_fd, html_file = tempfile.mkstemp(suffix=".html")
+    else:
+        # Build the final report next to the live one and swap it in atomically,
+        # so a refresh mid-write never loads an empty or partial page
+        os.close(html_fd)
+        live_file = html_file
+        html_fd, html_file = tempfile.mkstemp(suffix=".html", dir=os.path.dirname(live_file))
+    try:
+        with os.fdopen(html_fd, "w", buffering=REPORT_WRITE_BUFFER, encoding="utf-8") as f:
+            stream_html_report(f, all_prompts_data, overall_stats, model, link_css=link_css)
+            f.flush()
+            os.fsync(f.fileno())
+        if live_file is not None:
+            os.replace(html_file, live_file)
+            html_file = live_file
+    except BaseException:
+        if live_file is not None:
+            os.unlink(html_file)
+        raise
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".html", delete=False) as f:
-        f.write(html_content)
-        html_file = f.name
+    if link_css:
+        write_css_file(os.path.dirname(html_file))
 
     print(f"✅ HTML report saved to: {html_file}")
-    if open_browser:
-        webbrowser.open(f"file://{html_file}")
+    if open_browser and not live_report:
+        _open_in_browser(html_file)
 
     return all_prompts_data, html_file
 
+async def main(prompts, temperatures, **kwargs):
+    """Run the analysis and release the shared connection pool afterwards."""
+    try:
+        return await autotemp_multi_prompt(prompts, temperatures, **kwargs)
+    finally:
+        disk_cache.close()
+        await close_client()
+
 if __name__ == "__main__":
+    try:
+        groq_api_key = get_groq_api_key()
+        print(f"✅ API Key loaded successfully (ends with: ...{groq_api_key[-8:]})")
+    except Exception as e:
+        print(f"❌ Error loading API key: {e}")
+        exit(1)
+
     prompts = [
         "Write a creative short story in 1 paragraph about a robot learning to cook.",
         "layout detailed business plan for surviving a coffee shop during ww3.",
@@ -448,7 +1736,7 @@ if __name__ == "__main__":
     print(f"🌡️  Temperatures: {temperatures}")
     print(f"🔥 Total responses to generate: {len(prompts) * len(temperatures)}")
 
-    results, html_file = autotemp_multi_prompt(prompts, temperatures)
+    results, html_file = asyncio.run(main(prompts, temperatures))
 
     print("\n🎉 Analysis complete!")
     print(f"📊 Results saved to: {html_file}")